@@ -40,6 +40,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'reviews.middleware.MetricsMiddleware',  # métriques Prometheus (/metrics)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -137,3 +138,35 @@ LOGIN_URL = "login"
 LOGIN_REDIRECT_URL = "feed"
 LOGOUT_REDIRECT_URL = "login"
 
+
+# Flux : nombre de posts par page
+FEED_PAGE_SIZE = 20
+
+# Archivage : tickets et critiques plus anciens que ce délai (en jours) quittent les tables principales
+# (commande : python manage.py archive_posts)
+ARCHIVE_AFTER_DAYS = 365
+
+# Limitation de débit (seau à jetons) par vue, par utilisateur ou par adresse IP
+# "rate" : "N/s", "N/m", "N/h" ou "N/d" ; "key" : "ip", "user" ou "user_or_ip"
+RATE_LIMITS = {
+    "signin": {"rate": "10/m", "key": "ip"},
+    "signup": {"rate": "5/h", "key": "ip"},
+    "ticket_create": {"rate": "20/h", "key": "user"},
+    "review_create_combo": {"rate": "20/h", "key": "user"},
+    "subscriptions": {"rate": "30/m", "key": "user"},
+}
+
+# Nombre maximal de requêtes coûteuses (hachage de mot de passe, envoi d'images) traitées en même temps
+CONCURRENCY_LIMITS = {
+    "expensive": 8,
+}
+
+# Cache utilisé par la limitation ; il doit être partagé entre workers (Redis, Memcached…)
+# pour que les limites soient globales et non par processus.
+# Le plafond de concurrence exige Redis ou Memcached ; il est désactivé (avec un avertissement) sinon.
+RATE_LIMIT_CACHE = "default"
+
+# Nombre de proxys inverses de confiance devant l'application (nginx : 1).
+# S'il est non nul, l'adresse du client est lue dans l'en-tête ci-dessous au lieu de REMOTE_ADDR.
+RATE_LIMIT_TRUSTED_PROXIES = 0
+RATE_LIMIT_FORWARDED_HEADER = "HTTP_X_FORWARDED_FOR"
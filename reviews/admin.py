@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Ticket, Review, UserFollows
+from .models import Ticket, Review, UserFollows, ArchivedTicket, ArchivedReview
 
 @admin.register(Ticket)
 class TicketAdmin(admin.ModelAdmin):
@@ -17,3 +17,15 @@ class ReviewAdmin(admin.ModelAdmin):
 class UserFollowsAdmin(admin.ModelAdmin):
     list_display = ("user", "followed_user")
     search_fields = ("user__username", "followed_user__username")
+
+@admin.register(ArchivedTicket)
+class ArchivedTicketAdmin(admin.ModelAdmin):
+    list_display = ("id", "title", "user", "time_created", "time_archived")
+    search_fields = ("title", "user__username")
+    ordering = ("-time_created",)
+
+@admin.register(ArchivedReview)
+class ArchivedReviewAdmin(admin.ModelAdmin):
+    list_display = ("id", "headline", "rating", "user", "ticket", "time_created", "time_archived")
+    search_fields = ("headline", "user__username", "ticket__title")
+    ordering = ("-time_created",)
@@ -0,0 +1,176 @@
+# reviews/archive.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import CharField, Exists, OuterRef, Q, Value
+from django.http import Http404
+from django.utils import timezone
+
+from .models import ArchivedReview, ArchivedTicket, Review, Ticket, UserFollows
+
+
+# Champs recopiés entre tables chaudes et tables d'archive
+TICKET_FIELDS = ("id", "title", "description", "user_id", "image", "time_created")
+REVIEW_FIELDS = ("id", "ticket_id", "rating", "headline", "body", "user_id", "time_created")
+
+# Nombre de tickets déplacés par transaction
+ARCHIVE_BATCH_SIZE = 500
+
+
+def archive_cutoff(days=None):
+    # Date limite : tout ce qui est plus ancien peut partir en archive
+    if days is None:
+        days = settings.ARCHIVE_AFTER_DAYS
+    return timezone.now() - timedelta(days=days)
+
+
+def archivable_tickets(cutoff):
+    # Un ticket n'est archivé que si lui et toutes ses critiques sont antérieurs à la date limite
+    return (
+        Ticket.objects
+        .filter(time_created__lt=cutoff)
+        .exclude(reviews__time_created__gte=cutoff)
+    )
+
+
+def archive_posts(cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    # Déplace les tickets anciens (et leurs critiques) vers les tables d'archive
+    # Renvoie le nombre de tickets et de critiques archivés
+    tickets_count = reviews_count = 0
+    while True:
+        with transaction.atomic():
+            ids = list(archivable_tickets(cutoff).values_list("id", flat=True)[:batch_size])
+            if not ids:
+                break
+            tickets = Ticket.objects.filter(id__in=ids).values(*TICKET_FIELDS)
+            reviews = Review.objects.filter(ticket_id__in=ids).values(*REVIEW_FIELDS)
+            ArchivedTicket.objects.bulk_create(ArchivedTicket(**row) for row in tickets)
+            archived_reviews = ArchivedReview.objects.bulk_create(
+                ArchivedReview(**row) for row in reviews
+            )
+            # La suppression en cascade retire aussi les critiques des tables chaudes
+            Ticket.objects.filter(id__in=ids).delete()
+        tickets_count += len(ids)
+        reviews_count += len(archived_reviews)
+    return tickets_count, reviews_count
+
+
+def restore_ticket(pk):
+    # Remet un ticket archivé (et ses critiques) dans les tables chaudes, avec les mêmes identifiants
+    # Idempotent : si une autre requête l'a déjà restauré, on renvoie simplement le ticket chaud
+    try:
+        with transaction.atomic():
+            archived = ArchivedTicket.objects.select_for_update().filter(pk=pk).first()
+            if archived is not None:
+                _move_to_hot(archived)
+    except IntegrityError:
+        pass  # restauration concurrente : le ticket est déjà dans les tables chaudes
+    return Ticket.objects.get(pk=pk)
+
+
+def _move_to_hot(archived_ticket):
+    archived_reviews = list(archived_ticket.reviews.values(*REVIEW_FIELDS))
+    ticket_row = {field: getattr(archived_ticket, field) for field in TICKET_FIELDS}
+    Ticket.objects.bulk_create([Ticket(**ticket_row)])
+    Review.objects.bulk_create(Review(**row) for row in archived_reviews)
+
+    # auto_now_add écrase time_created à l'insertion : on rétablit les dates d'origine
+    Ticket.objects.filter(pk=archived_ticket.pk).update(time_created=archived_ticket.time_created)
+    for row in archived_reviews:
+        Review.objects.filter(pk=row["id"]).update(time_created=row["time_created"])
+
+    archived_ticket.delete()
+
+
+def _ticket_copy(archived_ticket):
+    # Ticket non enregistré reprenant les valeurs archivées (affichage seul, sans restauration)
+    return Ticket(**{field: getattr(archived_ticket, field) for field in TICKET_FIELDS})
+
+
+def get_ticket_or_404(pk, **filters):
+    # Comme get_object_or_404(Ticket, …) mais avec repli transparent sur l'archive :
+    # un ticket archivé est renvoyé sous forme de copie non enregistrée (rien n'est déplacé)
+    try:
+        return Ticket.objects.get(pk=pk, **filters)
+    except Ticket.DoesNotExist:
+        pass
+    archived = ArchivedTicket.objects.filter(pk=pk, **filters).first()
+    if archived is None:
+        raise Http404("Ticket introuvable.")
+    return _ticket_copy(archived)
+
+
+def get_review_or_404(pk, **filters):
+    # Comme get_object_or_404(Review, …) mais avec repli transparent sur l'archive (voir get_ticket_or_404)
+    try:
+        return Review.objects.get(pk=pk, **filters)
+    except Review.DoesNotExist:
+        pass
+    archived = ArchivedReview.objects.filter(pk=pk, **filters).select_related("ticket").first()
+    if archived is None:
+        raise Http404("Critique introuvable.")
+    review = Review(**{field: getattr(archived, field) for field in REVIEW_FIELDS})
+    review.ticket = _ticket_copy(archived.ticket)
+    return review
+
+
+def is_archived_copy(instance):
+    # Les copies issues de l'archive sont les seules instances non enregistrées ayant déjà un identifiant
+    return instance._state.adding and instance.pk is not None
+
+
+def hot_ticket(ticket):
+    # Ticket utilisable pour une écriture : restaure la copie archivée si besoin
+    return restore_ticket(ticket.pk) if is_archived_copy(ticket) else ticket
+
+
+def save_post(instance):
+    # Enregistre un ticket ou une critique (formulaire déjà validé) ;
+    # s'il s'agit d'une copie archivée, le ticket n'est restauré qu'à ce moment-là
+    if is_archived_copy(instance):
+        restore_ticket(instance.pk if isinstance(instance, Ticket) else instance.ticket_id)
+        instance._state.adding = False
+    instance.save()
+
+
+def delete_post(instance):
+    # Supprime un ticket ou une critique, directement dans l'archive s'il y est (sans restauration)
+    if not is_archived_copy(instance):
+        instance.delete()
+    elif isinstance(instance, Ticket):
+        ArchivedTicket.objects.filter(pk=instance.pk).delete()
+    else:
+        ArchivedReview.objects.filter(pk=instance.pk).delete()
+
+
+def has_reviewed(ticket_id, user):
+    # Vrai si l'utilisateur a déjà critiqué ce ticket, qu'il soit archivé ou non
+    return (
+        Review.objects.filter(ticket_id=ticket_id, user=user).exists()
+        or ArchivedReview.objects.filter(ticket_id=ticket_id, user=user).exists()
+    )
+
+
+def get_users_viewable_archived_tickets(user):
+    # Équivalent archivé de views.get_users_viewable_tickets
+    following = UserFollows.objects.filter(user=user).values_list("followed_user_id", flat=True)
+    user_review_exists = ArchivedReview.objects.filter(ticket=OuterRef("pk"), user=user)
+    return (
+        ArchivedTicket.objects
+        .filter(Q(user__in=following) | Q(user=user))
+        .select_related("user")
+        .annotate(content_type=Value("TICKET", CharField()))
+        .annotate(has_reviewed=Exists(user_review_exists))
+    )
+
+
+def get_users_viewable_archived_reviews(user):
+    # Équivalent archivé de views.get_users_viewable_reviews
+    following = UserFollows.objects.filter(user=user).values_list("followed_user_id", flat=True)
+    return (
+        ArchivedReview.objects
+        .filter(Q(user__in=following) | Q(user=user) | Q(ticket__user=user))
+        .select_related("user", "ticket", "ticket__user")
+        .annotate(content_type=Value("REVIEW", CharField()))
+    )
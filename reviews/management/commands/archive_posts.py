@@ -0,0 +1,33 @@
+# reviews/management/commands/archive_posts.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from reviews.archive import archive_cutoff, archivable_tickets, archive_posts
+
+
+class Command(BaseCommand):
+    help = (
+        "Déplace les tickets (et leurs critiques) plus anciens que ARCHIVE_AFTER_DAYS "
+        "vers les tables d'archive. À lancer périodiquement (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=settings.ARCHIVE_AFTER_DAYS,
+            help="Ancienneté minimale (en jours) des posts à archiver.",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Affiche le nombre de tickets concernés sans rien déplacer.",
+        )
+
+    def handle(self, *args, days, dry_run=False, **options):
+        cutoff = archive_cutoff(days)
+        if dry_run:
+            count = archivable_tickets(cutoff).count()
+            self.stdout.write(f"{count} ticket(s) antérieur(s) au {cutoff:%Y-%m-%d} à archiver.")
+            return
+        tickets_count, reviews_count = archive_posts(cutoff)
+        self.stdout.write(self.style.SUCCESS(
+            f"{tickets_count} ticket(s) et {reviews_count} critique(s) archivé(s)."
+        ))
@@ -0,0 +1,97 @@
+# reviews/management/commands/dedupe_ticket_images.py
+import os
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reviews.models import ArchivedTicket, Ticket
+from reviews.signals import is_image_referenced
+from reviews.storage import content_name, hash_file
+
+
+class Command(BaseCommand):
+    help = (
+        "Range les images existantes de tickets/ sous leur nom adressé par contenu "
+        "et supprime les copies en double."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Affiche les opérations sans rien modifier.",
+        )
+        parser.add_argument(
+            "--prune", action="store_true",
+            help="Supprime aussi les fichiers qu'aucun ticket ne référence.",
+        )
+
+    def handle(self, *args, dry_run=False, prune=False, **options):
+        field = Ticket._meta.get_field("image")
+        storage = field.storage
+        directory = field.upload_to.strip("/")
+        root = storage.path(directory)
+        if not os.path.isdir(root):
+            self.stdout.write(f"Aucun dossier {root}, rien à faire.")
+            return
+
+        moved = removed = pruned = saved = 0
+        planned = set()  # cibles déjà produites pendant un --dry-run
+        for dirpath, _dirnames, filenames in os.walk(root):
+            for filename in sorted(filenames):
+                if filename.startswith("."):
+                    continue  # fichiers temporaires d'un envoi en cours, verrou
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, storage.location).replace(os.sep, "/")
+                size = os.path.getsize(path)
+                references = [
+                    Ticket.objects.filter(image=name),
+                    ArchivedTicket.objects.filter(image=name),
+                ]
+                if not is_image_referenced(name):
+                    # Les fichiers réutilisés très récemment sont épargnés (voir storage.REUSE_GRACE_PERIOD),
+                    # y compris dans l'aperçu --dry-run
+                    if not prune:
+                        continue
+                    if dry_run:
+                        if storage.is_past_grace_period(name):
+                            self.stdout.write(f"orphelin à supprimer : {name}")
+                            pruned += 1
+                            saved += size
+                    elif storage.delete_if_unused(name, lambda: is_image_referenced(name)):
+                        self.stdout.write(f"orphelin supprimé : {name}")
+                        pruned += 1
+                        saved += size
+                    continue
+                if storage.is_content_name(name):
+                    continue
+
+                extension = os.path.splitext(filename)[1].lower()
+                target = content_name(directory, hash_file(path), extension)
+                if dry_run:
+                    duplicate = os.path.exists(storage.path(target)) or target in planned
+                    planned.add(target)
+                else:
+                    # La cible est créée (lien ou copie) avant la mise à jour des lignes,
+                    # et l'original n'est retiré qu'après validation : aucun ticket ne pointe dans le vide
+                    duplicate = storage.adopt(path, target)
+                    with transaction.atomic():
+                        for qs in references:
+                            qs.update(image=target)
+                    os.remove(path)
+                self.stdout.write(f"{name} -> {target}" + (" (doublon)" if duplicate else ""))
+                if duplicate:
+                    removed += 1
+                    saved += size
+                else:
+                    moved += 1
+
+        if dry_run:
+            self.stdout.write(
+                f"Aperçu : {moved} fichier(s) à déplacer, {removed} doublon(s) et {pruned} orphelin(s) "
+                f"à supprimer, {saved} octet(s) à libérer."
+            )
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"{moved} fichier(s) déplacé(s), {removed} doublon(s) et {pruned} orphelin(s) "
+            f"supprimé(s), {saved} octet(s) libéré(s)."
+        ))
@@ -0,0 +1,68 @@
+# reviews/metrics.py
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+
+# Métriques exposées sur /metrics (format texte Prometheus)
+# Avec plusieurs workers gunicorn, définir PROMETHEUS_MULTIPROC_DIR avant le démarrage :
+# chaque processus écrit alors ses valeurs dans des fichiers mmap de ce dossier,
+# agrégés au moment de la collecte (voir README).
+
+REQUEST_LATENCY = Histogram(
+    "litrevu_request_duration_seconds",
+    "Durée de traitement des requêtes, par nom d'URL.",
+    ["view", "method"],
+)
+REQUESTS = Counter(
+    "litrevu_requests",
+    "Requêtes traitées, par nom d'URL et code de réponse.",
+    ["view", "method", "status"],
+)
+FEED_SIZE = Histogram(
+    "litrevu_feed_posts",
+    "Nombre de posts affichés par page du flux.",
+    buckets=(0, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+)
+POSTS_CREATED = Counter(
+    "litrevu_created",
+    "Objets créés (ticket, review, follow).",
+    ["kind"],
+)
+UPLOAD_BYTES = Counter(
+    "litrevu_upload_bytes",
+    "Octets d'images de tickets reçus ; result=deduplicated si le contenu existait déjà.",
+    ["result"],
+)
+THROTTLED = Counter(
+    "litrevu_throttled",
+    "Requêtes refusées par la limitation de débit (429) ou de concurrence (503).",
+    ["scope", "reason"],
+)
+DB_CONNECTIONS = Counter(
+    "litrevu_db_connections_opened",
+    "Connexions à la base de données ouvertes.",
+)
+DB_QUERIES = Histogram(
+    "litrevu_db_queries_per_request",
+    "Nombre de requêtes SQL exécutées par requête HTTP.",
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200),
+)
+
+
+def render_metrics():
+    # Renvoie (contenu, content-type) ; agrège tous les workers en mode multiprocessus
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,36 @@
+# reviews/middleware.py
+import time
+
+from django.db import connection
+
+from .metrics import DB_QUERIES, REQUEST_LATENCY, REQUESTS
+
+
+class MetricsMiddleware:
+    """
+    Mesure la durée de chaque requête et le nombre de requêtes SQL exécutées,
+    étiquetées par nom d'URL (reviews/urls.py).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(count_queries):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else "unmatched"
+        REQUEST_LATENCY.labels(view, request.method).observe(duration)
+        REQUESTS.labels(view, request.method, str(response.status_code)).inc()
+        DB_QUERIES.observe(queries)
+        return response
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:02
+
+import reviews.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_remove_review_unique_review_per_ticket_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ticket',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=reviews.storage.DedupFileSystemStorage(), upload_to='tickets/'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:04
+
+import django.core.validators
+import django.db.models.deletion
+import reviews.storage
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_ticket_image_dedup_storage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTicket',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=128)),
+                ('description', models.TextField(blank=True, max_length=2048)),
+                ('image', models.ImageField(blank=True, null=True, storage=reviews.storage.DedupFileSystemStorage(), upload_to='tickets/')),
+                ('time_created', models.DateTimeField(db_index=True)),
+                ('time_archived', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_tickets', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedReview',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('rating', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(5)])),
+                ('headline', models.CharField(max_length=128)),
+                ('body', models.TextField(blank=True, max_length=8192)),
+                ('time_created', models.DateTimeField(db_index=True)),
+                ('time_archived', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_reviews', to=settings.AUTH_USER_MODEL)),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='reviews.archivedticket')),
+            ],
+        ),
+    ]
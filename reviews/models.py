@@ -4,6 +4,8 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
 from django.db.models import Q, F
 
+from .storage import ticket_image_storage
+
 
 # Modèle Ticket : représente une demande de critique
 class Ticket(models.Model):
@@ -12,12 +14,18 @@ class Ticket(models.Model):
     user = models.ForeignKey(to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE)  
     # auteur du ticket (lié à l'utilisateur connecté)
 
-    image = models.ImageField(upload_to="tickets/", null=True, blank=True)  
-    # image optionnelle liée au ticket, stockée dans /media/tickets/
+    image = models.ImageField(
+        upload_to="tickets/", storage=ticket_image_storage, null=True, blank=True
+    )  
+    # image optionnelle liée au ticket, stockée dans /media/tickets/ (une seule copie par contenu)
 
     time_created = models.DateTimeField(auto_now_add=True)  
     # date/heure automatique lors de la création
 
+    class Meta:
+        # index dans l'ordre du flux (pagination par curseur) et pour la sélection des tickets à archiver
+        indexes = [models.Index(fields=["-time_created", "-id"], name="ticket_time_created_idx")]
+
     def __str__(self):
         # représentation textuelle pratique pour l’admin Django
         return f"Ticket<{self.id}> {self.title}"
@@ -50,6 +58,8 @@ class Review(models.Model):
                 fields=["ticket", "user"], name="unique_review_per_user_and_ticket"
             )
         ]
+        # index dans l'ordre du flux (pagination par curseur) et pour la sélection des tickets à archiver
+        indexes = [models.Index(fields=["-time_created", "-id"], name="review_time_created_idx")]
 
     def __str__(self):
         return f"Review<{self.id}> {self.headline} ({self.rating}/5)"
@@ -83,3 +93,42 @@ class UserFollows(models.Model):
 
     def __str__(self):
         return f"{self.user} → {self.followed_user}"
+
+
+# Modèles d'archive : tickets et critiques anciens déplacés hors des tables "chaudes"
+# Un ticket est toujours archivé avec toutes ses critiques (voir reviews/archive.py)
+class ArchivedTicket(models.Model):
+    id = models.BigIntegerField(primary_key=True)  # même identifiant que le ticket d'origine
+    title = models.CharField(max_length=128)
+    description = models.TextField(max_length=2048, blank=True)
+    user = models.ForeignKey(
+        to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="archived_tickets"
+    )
+    image = models.ImageField(
+        upload_to="tickets/", storage=ticket_image_storage, null=True, blank=True
+    )
+    time_created = models.DateTimeField(db_index=True)  # date d'origine, recopiée telle quelle
+    time_archived = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"ArchivedTicket<{self.id}> {self.title}"
+
+
+class ArchivedReview(models.Model):
+    id = models.BigIntegerField(primary_key=True)  # même identifiant que la critique d'origine
+    ticket = models.ForeignKey(
+        to=ArchivedTicket, on_delete=models.CASCADE, related_name="reviews"
+    )
+    rating = models.PositiveSmallIntegerField(
+        validators=[MinValueValidator(0), MaxValueValidator(5)]
+    )
+    headline = models.CharField(max_length=128)
+    body = models.TextField(max_length=8192, blank=True)
+    user = models.ForeignKey(
+        to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="archived_reviews"
+    )
+    time_created = models.DateTimeField(db_index=True)
+    time_archived = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"ArchivedReview<{self.id}> {self.headline} ({self.rating}/5)"
@@ -0,0 +1,156 @@
+# reviews/ratelimit.py
+import logging
+import math
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.memcached import BaseMemcachedCache
+from django.core.cache.backends.redis import RedisCache
+from django.shortcuts import render
+
+from .metrics import THROTTLED
+
+
+# Durée des périodes acceptées dans les débits ("10/m" = 10 requêtes par minute)
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# Durée de vie d'un créneau de concurrence, jamais prolongée : si un worker meurt en cours
+# de requête, son créneau se libère seul après ce délai (supérieur au timeout gunicorn)
+CONCURRENCY_TTL = 120
+
+# Backends dont add() est atomique et partagé entre processus (SET NX / add memcached)
+ATOMIC_CACHE_BACKENDS = (RedisCache, BaseMemcachedCache)
+
+logger = logging.getLogger(__name__)
+_warned_caches = set()
+
+
+def parse_rate(rate):
+    # "10/m" -> (capacité du seau, jetons rechargés par seconde)
+    count, period = rate.split("/")
+    count = int(count)
+    return count, count / PERIODS[period]
+
+
+def client_ip(request):
+    # Adresse du client : derrière N proxys de confiance (RATE_LIMIT_TRUSTED_PROXIES),
+    # c'est la N-ième adresse en partant de la fin de l'en-tête X-Forwarded-For ;
+    # les adresses plus à gauche peuvent être forgées par le client
+    proxies = settings.RATE_LIMIT_TRUSTED_PROXIES
+    forwarded = request.META.get(settings.RATE_LIMIT_FORWARDED_HEADER, "")
+    if proxies and forwarded:
+        addresses = [address.strip() for address in forwarded.split(",") if address.strip()]
+        if addresses:
+            return addresses[-min(proxies, len(addresses))]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def client_key(request, key):
+    # Identifie le client : utilisateur connecté, adresse IP, ou l'utilisateur à défaut l'IP
+    if key in ("user", "user_or_ip") and request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    return f"ip:{client_ip(request)}"
+
+
+def take_token(cache, cache_key, capacity, refill):
+    # Seau à jetons stocké dans le cache : renvoie 0 si la requête passe,
+    # sinon le nombre de secondes avant le prochain jeton disponible.
+    # La lecture/écriture n'est pas atomique : quelques requêtes concurrentes peuvent
+    # dépasser la limite, ce qui est acceptable pour lisser des rafales.
+    now = time.time()
+    tokens, last = cache.get(cache_key, (capacity, now))
+    tokens = min(capacity, tokens + (now - last) * refill)
+    timeout = math.ceil(capacity / refill)
+    if tokens >= 1:
+        cache.set(cache_key, (tokens - 1, now), timeout)
+        return 0
+    cache.set(cache_key, (tokens, now), timeout)
+    return (1 - tokens) / refill
+
+
+def _refused(request, status, retry_after):
+    response = render(request, "too_many_requests.html", {"status": status}, status=status)
+    response["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def rate_limit(scope, methods=("POST",)):
+    """
+    Limite le débit d'une vue selon settings.RATE_LIMITS[scope]
+    ({"rate": "10/m", "key": "ip" | "user" | "user_or_ip"}).
+    Au-delà, répond 429 avec un en-tête Retry-After.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            config = settings.RATE_LIMITS.get(scope)
+            if config and request.method in methods:
+                capacity, refill = parse_rate(config["rate"])
+                cache = caches[settings.RATE_LIMIT_CACHE]
+                cache_key = f"ratelimit:{scope}:{client_key(request, config.get('key', 'user_or_ip'))}"
+                retry_after = take_token(cache, cache_key, capacity, refill)
+                if retry_after:
+                    THROTTLED.labels(scope, "rate").inc()
+                    return _refused(request, 429, retry_after)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _shared_cache(alias):
+    # Renvoie le cache s'il est partagé entre processus avec un add() atomique (Redis, Memcached),
+    # sinon None avec un avertissement unique : un cache local à chaque worker ne verrait jamais
+    # plus d'une requête en cours, et les caches fichier/base ne garantissent pas l'atomicité
+    cache = caches[alias]
+    if isinstance(cache, ATOMIC_CACHE_BACKENDS):
+        return cache
+    if alias not in _warned_caches:
+        _warned_caches.add(alias)
+        logger.warning(
+            "Plafond de concurrence désactivé : le cache %r (%s) n'est ni Redis ni Memcached. "
+            "Configurer RATE_LIMIT_CACHE vers un cache partagé à opérations atomiques.",
+            alias,
+            type(cache).__name__,
+        )
+    return None
+
+
+def _acquire_slot(cache, pool, limit):
+    # Réserve un des `limit` créneaux du pool : une clé par requête en cours, posée avec add()
+    # (atomique) et sa propre durée de vie. Renvoie la clé obtenue, ou None si tout est occupé.
+    start = random.randrange(limit)  # répartit les tentatives entre créneaux
+    for offset in range(limit):
+        slot_key = f"concurrency:{pool}:{(start + offset) % limit}"
+        if cache.add(slot_key, 1, CONCURRENCY_TTL):
+            return slot_key
+    return None
+
+
+def concurrency_limit(pool, methods=("POST",)):
+    """
+    Plafonne le nombre de requêtes coûteuses traitées en même temps
+    (settings.CONCURRENCY_LIMITS[pool]), tous workers confondus.
+    Nécessite un cache Redis ou Memcached ; désactivé (avec un avertissement) sinon.
+    Au-delà, répond 503 avec un en-tête Retry-After.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            limit = settings.CONCURRENCY_LIMITS.get(pool)
+            cache = _shared_cache(settings.RATE_LIMIT_CACHE) if limit else None
+            if cache is None or request.method not in methods:
+                return view(request, *args, **kwargs)
+
+            slot_key = _acquire_slot(cache, pool, limit)
+            if slot_key is None:
+                THROTTLED.labels(pool, "concurrency").inc()
+                return _refused(request, 503, 1)
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                cache.delete(slot_key)
+        return wrapper
+    return decorator
@@ -0,0 +1,66 @@
+# reviews/signals.py
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .metrics import DB_CONNECTIONS, POSTS_CREATED
+from .models import ArchivedTicket, Review, Ticket, UserFollows
+
+
+def release_ticket_image(name):
+    # Comptage de références : le fichier n'est supprimé que si plus aucun ticket ne l'utilise
+    if name:
+        Ticket._meta.get_field("image").storage.delete_if_unused(
+            name, lambda: is_image_referenced(name)
+        )
+
+
+def is_image_referenced(name):
+    return (
+        Ticket.objects.filter(image=name).exists()
+        or ArchivedTicket.objects.filter(image=name).exists()
+    )
+
+
+def _release_on_commit(name):
+    # On attend la validation de la transaction pour ne pas supprimer un fichier encore référencé
+    transaction.on_commit(lambda: release_ticket_image(name))
+
+
+@receiver(pre_save, sender=Ticket)
+def remember_previous_image(sender, instance, **kwargs):
+    # Mémorise l'image actuelle en base pour détecter un remplacement ou un effacement
+    instance._previous_image = None
+    if instance.pk:
+        instance._previous_image = (
+            Ticket.objects.filter(pk=instance.pk).values_list("image", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Ticket)
+def release_replaced_image(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous_image", None)
+    if previous and previous != instance.image.name:
+        _release_on_commit(previous)
+
+
+@receiver(post_delete, sender=Ticket)
+@receiver(post_delete, sender=ArchivedTicket)
+def release_deleted_image(sender, instance, **kwargs):
+    if instance.image:
+        _release_on_commit(instance.image.name)
+
+
+# Métriques : objets créés et connexions à la base
+@receiver(post_save, sender=Ticket)
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=UserFollows)
+def count_created(sender, instance, created, **kwargs):
+    if created:
+        POSTS_CREATED.labels(sender._meta.model_name).inc()
+
+
+@receiver(connection_created)
+def count_db_connection(sender, connection, **kwargs):
+    DB_CONNECTIONS.inc()
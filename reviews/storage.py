@@ -0,0 +1,174 @@
+# reviews/storage.py
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.core.files import locks
+from django.core.files.storage import FileSystemStorage
+from django.utils._os import safe_makedirs
+from django.utils.deconstruct import deconstructible
+
+from .metrics import UPLOAD_BYTES
+
+
+# Taille des blocs lus lors du hachage d'un fichier déjà présent sur le disque
+HASH_CHUNK_SIZE = 64 * 1024
+
+# Un fichier réutilisé (ou créé) depuis moins longtemps que ce délai n'est jamais supprimé :
+# le ticket qui vient de le référencer n'est peut-être pas encore validé en base.
+# Les orphelins ainsi épargnés sont ramassés par `dedupe_ticket_images --prune`.
+REUSE_GRACE_PERIOD = 300
+
+
+def content_name(directory, digest, extension):
+    # Chemin adressé par contenu : <dossier>/ab/cd/abcdef…<ext>
+    # Les deux niveaux de sous-dossiers évitent d'avoir des milliers de fichiers dans un même répertoire
+    return "/".join(
+        part for part in (directory, digest[:2], digest[2:4], f"{digest}{extension}") if part
+    )
+
+
+def hash_file(path):
+    # Empreinte SHA-256 d'un fichier existant, lue par blocs pour ne pas tout charger en mémoire
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+@deconstructible
+class DedupFileSystemStorage(FileSystemStorage):
+    """
+    Stockage dédupliqué : un seul fichier par contenu.
+
+    Le fichier envoyé est haché pendant son écriture sur le disque, puis rangé
+    sous un nom dérivé de son empreinte. Si ce contenu existe déjà, la copie
+    temporaire est simplement supprimée et le nom existant est réutilisé.
+    Réutilisation et suppression d'un fichier se font sous un même verrou
+    (voir delete_if_unused) ; la suppression des orphelins est déclenchée par
+    les signaux de reviews.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Le nom final dépend du contenu et non du nom d'origine : pas de suffixe aléatoire
+        return name
+
+    def _save(self, name, content):
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        full_directory = self.path(directory) if directory else self.location
+        self._makedirs(full_directory)
+
+        # Écriture dans un fichier temporaire du même système de fichiers (renommage atomique)
+        fd, tmp_path = tempfile.mkstemp(dir=full_directory, prefix=".upload-")
+        sha = hashlib.sha256()
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    sha.update(chunk)
+                    tmp.write(chunk)
+
+            final_name = content_name(directory, sha.hexdigest(), extension)
+            final_path = self.path(final_name)
+            size = os.path.getsize(tmp_path)
+            with self._blob_lock(directory):
+                if os.path.exists(final_path):
+                    # Contenu déjà stocké : on garde la copie existante et on la marque
+                    # comme réutilisée pour qu'une suppression concurrente l'épargne
+                    os.remove(tmp_path)
+                    os.utime(final_path)
+                    UPLOAD_BYTES.labels("deduplicated").inc(size)
+                else:
+                    UPLOAD_BYTES.labels("stored").inc(size)
+                    self._makedirs(os.path.dirname(final_path))
+                    os.replace(tmp_path, final_path)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(final_path, self.file_permissions_mode)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return final_name
+
+    def adopt(self, path, name):
+        # Rend le contenu de `path` disponible sous `name` sans retirer `path`
+        # (lien physique, sinon copie) ; renvoie True si `name` existait déjà
+        with self._blob_lock(self._lock_directory(name)):
+            target = self.path(name)
+            if os.path.exists(target):
+                os.utime(target)
+                return True
+            self._makedirs(os.path.dirname(target))
+            try:
+                os.link(path, target)
+            except OSError:
+                shutil.copy2(path, target)
+            os.utime(target)
+            return False
+
+    def delete_if_unused(self, name, is_referenced):
+        # Supprime `name` si `is_referenced()` est faux, sous le verrou partagé avec _save :
+        # un envoi ne peut pas réutiliser le fichier entre la vérification et la suppression,
+        # et un fichier réutilisé récemment (ticket pas encore validé) est conservé
+        with self._blob_lock(self._lock_directory(name)):
+            if not self.is_past_grace_period(name) or is_referenced():
+                return False
+            os.remove(self.path(name))
+            return True
+
+    def is_past_grace_period(self, name):
+        # Vrai si le fichier existe et n'a pas été créé ni réutilisé depuis REUSE_GRACE_PERIOD
+        try:
+            modified = os.path.getmtime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return time.time() - modified >= REUSE_GRACE_PERIOD
+
+    @contextmanager
+    def _blob_lock(self, directory):
+        # Verrou exclusif inter-processus, un par dossier d'envoi (fichier .dedup.lock)
+        full_directory = self.path(directory) if directory else self.location
+        self._makedirs(full_directory)
+        with open(os.path.join(full_directory, ".dedup.lock"), "ab") as lock_file:
+            locks.lock(lock_file, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lock_file)
+
+    def _lock_directory(self, name):
+        # Dossier d'envoi d'origine : "tickets" pour "tickets/ab/cd/<empreinte>.jpg"
+        if self.is_content_name(name):
+            return "/".join(name.split("/")[:-3])
+        return os.path.dirname(name)
+
+    def _makedirs(self, directory):
+        if self.directory_permissions_mode is not None:
+            safe_makedirs(directory, self.directory_permissions_mode, exist_ok=True)
+        else:
+            os.makedirs(directory, exist_ok=True)
+
+    def is_content_name(self, name):
+        # Vrai si le nom suit déjà la disposition <dossier>/ab/cd/<empreinte><ext>
+        parts = name.split("/")
+        if len(parts) < 3:
+            return False
+        digest = os.path.splitext(parts[-1])[0]
+        return (
+            len(digest) == 64
+            and all(c in "0123456789abcdef" for c in digest)
+            and parts[-3] == digest[:2]
+            and parts[-2] == digest[2:4]
+        )
+
+
+ticket_image_storage = DedupFileSystemStorage()
@@ -1,3 +1,444 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from prometheus_client.parser import text_string_to_metric_families
+
+from .archive import archive_cutoff, archive_posts, restore_ticket
+from .models import ArchivedReview, ArchivedTicket, Review, Ticket
+from . import ratelimit
+from .ratelimit import concurrency_limit
+from .storage import REUSE_GRACE_PERIOD
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+# Stockage dédupliqué des images de tickets
+class DedupStorageTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        settings_override = override_settings(MEDIA_ROOT=self.media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create(username="alice")
+
+    def create_ticket(self, data, filename="cover.jpg"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Ticket.objects.create(
+                title="t", user=self.user, image=SimpleUploadedFile(filename, data)
+            )
+
+    def age(self, ticket):
+        # Simule un fichier plus ancien que le délai de grâce
+        past = time.time() - REUSE_GRACE_PERIOD - 1
+        os.utime(ticket.image.path, (past, past))
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.create_ticket(b"same content", "a.JPG")
+        second = self.create_ticket(b"same content", "b.jpg")
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.startswith("tickets/"))
+        self.assertTrue(first.image.name.endswith(".jpg"))
+        self.assertTrue(os.path.exists(first.image.path))
+
+    def test_file_released_with_last_reference(self):
+        first = self.create_ticket(b"shared")
+        second = self.create_ticket(b"shared")
+        path = first.image.path
+        self.age(first)
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(os.path.exists(path))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(os.path.exists(path))
+
+    def test_recently_reused_file_is_kept(self):
+        # Un envoi vient de réutiliser le fichier : une suppression concurrente doit l'épargner
+        ticket = self.create_ticket(b"reused")
+        path = ticket.image.path
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.delete()
+        self.assertTrue(os.path.exists(path))
+
+    def test_dedupe_command_migrates_legacy_files(self):
+        os.makedirs(os.path.join(self.media, "tickets"))
+        for name in ("one.png", "two.png"):
+            with open(os.path.join(self.media, "tickets", name), "wb") as f:
+                f.write(b"legacy")
+            Ticket.objects.create(title=name, user=self.user, image=f"tickets/{name}")
+
+        call_command("dedupe_ticket_images", stdout=open(os.devnull, "w"))
+
+        names = set(Ticket.objects.values_list("image", flat=True))
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertTrue(os.path.exists(os.path.join(self.media, name)))
+        self.assertFalse(os.path.exists(os.path.join(self.media, "tickets", "one.png")))
+        self.assertFalse(os.path.exists(os.path.join(self.media, "tickets", "two.png")))
+
+    def test_dry_run_prune_respects_grace_period(self):
+        os.makedirs(os.path.join(self.media, "tickets"))
+        old_path = os.path.join(self.media, "tickets", "old.png")
+        for path in (old_path, os.path.join(self.media, "tickets", "fresh.png")):
+            with open(path, "wb") as f:
+                f.write(b"orphan")
+        past = time.time() - REUSE_GRACE_PERIOD - 1
+        os.utime(old_path, (past, past))
+
+        out = StringIO()
+        call_command("dedupe_ticket_images", "--dry-run", "--prune", stdout=out)
+        self.assertIn("orphelin à supprimer : tickets/old.png", out.getvalue())
+        self.assertNotIn("fresh.png", out.getvalue())
+        self.assertIn("1 orphelin(s) à supprimer", out.getvalue())
+        self.assertTrue(os.path.exists(old_path))
+
+        call_command("dedupe_ticket_images", "--prune", stdout=StringIO())
+        self.assertFalse(os.path.exists(old_path))
+        self.assertTrue(os.path.exists(os.path.join(self.media, "tickets", "fresh.png")))
+
+
+# Archivage des anciens tickets et critiques
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="bob")
+        self.client.force_login(self.user)
+
+    def ticket(self, title, days):
+        ticket = Ticket.objects.create(title=title, user=self.user)
+        Ticket.objects.filter(pk=ticket.pk).update(time_created=timezone.now() - timedelta(days=days))
+        return ticket
+
+    def review(self, ticket, days, user=None):
+        review = Review.objects.create(ticket=ticket, user=user or self.user, headline="h", rating=3)
+        Review.objects.filter(pk=review.pk).update(time_created=timezone.now() - timedelta(days=days))
+        return review
+
+    def archive(self):
+        return archive_posts(archive_cutoff(365))
+
+    def test_ticket_archived_with_its_reviews_only_when_all_are_old(self):
+        kept = self.ticket("kept", 500)
+        self.review(kept, 1)
+        gone = self.ticket("gone", 450)
+        self.review(gone, 420)
+
+        self.assertEqual(self.archive(), (1, 1))
+        self.assertEqual(list(Ticket.objects.values_list("pk", flat=True)), [kept.pk])
+        self.assertEqual(ArchivedTicket.objects.get().pk, gone.pk)
+        self.assertEqual(ArchivedReview.objects.get().ticket_id, gone.pk)
+
+    def test_get_reads_archive_and_post_restores(self):
+        ticket = self.ticket("old", 400)
+        self.archive()
+        url = reverse("review_create_from_ticket", args=[ticket.pk])
+
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertTrue(ArchivedTicket.objects.filter(pk=ticket.pk).exists())
+        self.assertFalse(Ticket.objects.filter(pk=ticket.pk).exists())
+
+        self.client.post(url, {"headline": "h", "rating": 4, "body": ""})
+        restored = Ticket.objects.get(pk=ticket.pk)
+        self.assertFalse(ArchivedTicket.objects.filter(pk=ticket.pk).exists())
+        self.assertTrue(Review.objects.filter(ticket=restored, user=self.user).exists())
+
+    def test_invalid_post_does_not_restore(self):
+        ticket = self.ticket("old", 400)
+        self.archive()
+        url = reverse("ticket_update", args=[ticket.pk])
+
+        response = self.client.post(url, {"title": "", "description": ""})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["form"].errors)
+        self.assertTrue(ArchivedTicket.objects.filter(pk=ticket.pk).exists())
+        self.assertFalse(Ticket.objects.filter(pk=ticket.pk).exists())
+
+        self.client.post(url, {"title": "new title", "description": ""})
+        restored = Ticket.objects.get(pk=ticket.pk)
+        self.assertEqual(restored.title, "new title")
+        self.assertLess(restored.time_created, timezone.now() - timedelta(days=399))
+        self.assertFalse(ArchivedTicket.objects.filter(pk=ticket.pk).exists())
+
+    def test_archived_review_update_restores_its_ticket(self):
+        ticket = self.ticket("old", 400)
+        review = self.review(ticket, 390)
+        self.archive()
+
+        self.client.post(reverse("review_update", args=[review.pk]), {"headline": "edited", "rating": 5, "body": ""})
+        self.assertEqual(Review.objects.get(pk=review.pk).headline, "edited")
+        self.assertTrue(Ticket.objects.filter(pk=ticket.pk).exists())
+
+    def test_delete_archived_posts_without_restoring(self):
+        ticket = self.ticket("old", 400)
+        review = self.review(ticket, 390)
+        other = self.ticket("other", 400)
+        self.archive()
+
+        self.client.post(reverse("review_delete", args=[review.pk]))
+        self.assertFalse(ArchivedReview.objects.filter(pk=review.pk).exists())
+        self.assertTrue(ArchivedTicket.objects.filter(pk=ticket.pk).exists())
+
+        self.client.post(reverse("ticket_delete", args=[other.pk]))
+        self.assertFalse(ArchivedTicket.objects.filter(pk=other.pk).exists())
+        self.assertEqual(Ticket.objects.count(), 0)
+        self.assertEqual(Review.objects.count(), 0)
+
+    def test_malformed_cursor_falls_back_to_first_page(self):
+        self.ticket("recent", 1)
+        for cursor in (
+            "99999999999999999999999_TICKET_1",
+            "-99999999999999999999_REVIEW_1",
+            "1_TICKET_99999999999999999999999",
+            "garbage",
+        ):
+            response = self.client.get(reverse("feed"), {"avant": cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.context["is_first_page"])
+            self.assertEqual(len(response.context["posts"]), 1)
+
+    def test_restore_keeps_dates_and_is_idempotent(self):
+        ticket = self.ticket("old", 400)
+        review = self.review(ticket, 390)
+        created = Ticket.objects.get(pk=ticket.pk).time_created
+        self.archive()
+
+        restored = restore_ticket(ticket.pk)
+        self.assertEqual(restored.time_created, created)
+        self.assertEqual(Review.objects.get(pk=review.pk).ticket_id, ticket.pk)
+        self.assertEqual(restore_ticket(ticket.pk).pk, ticket.pk)
+
+    def test_concurrent_restore_does_not_fail(self):
+        # Une autre requête a déjà réinséré le ticket chaud alors que la ligne d'archive existe encore
+        ticket = self.ticket("old", 400)
+        self.archive()
+        Ticket.objects.bulk_create([Ticket(pk=ticket.pk, title="old", user=self.user)])
+        self.assertEqual(restore_ticket(ticket.pk).pk, ticket.pk)
+
+    @override_settings(FEED_PAGE_SIZE=1)
+    def test_feed_pages_list_each_post_once_across_archive(self):
+        hot_old = self.ticket("hot but old", 500)
+        self.review(hot_old, 1)
+        self.review(hot_old, 2, user=User.objects.create(username="carol"))
+        self.ticket("archived", 450)
+        archived_with_review = self.ticket("archived with review", 430)
+        self.review(archived_with_review, 420)
+        self.archive()
+
+        seen, url = [], reverse("feed")
+        while url:
+            response = self.client.get(url)
+            seen += [(post.content_type, post.pk, post.time_created) for post in response.context["posts"]]
+            cursor = response.context["next_cursor"]
+            url = f"{reverse('feed')}?avant={cursor}" if cursor else None
+
+        keys = [(content_type, pk) for content_type, pk, _ in seen]
+        self.assertEqual(len(keys), len(set(keys)))
+        self.assertEqual(len(keys), 6)
+        dates = [time_created for _, _, time_created in seen]
+        self.assertEqual(dates, sorted(dates, reverse=True))
+
+    def test_my_posts_history_sorted_by_date(self):
+        hot_old = self.ticket("hot but old", 730)
+        self.review(hot_old, 1)
+        self.ticket("archived", 400)
+        self.archive()
+
+        response = self.client.get(reverse("my_posts") + "?historique=1")
+        titles = [ticket.title for ticket in response.context["tickets"]]
+        self.assertEqual(titles, ["archived", "hot but old"])
+
+
+# Métriques Prometheus
+@override_settings(CONCURRENCY_LIMITS={})
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        settings_override = override_settings(MEDIA_ROOT=self.media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create(username="dora")
+        self.client.force_login(self.user)
+
+    def samples(self):
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        return {
+            (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+            for family in text_string_to_metric_families(response.content.decode())
+            for sample in family.samples
+        }
+
+    def delta(self, before, after, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        return after.get(key, 0) - before.get(key, 0)
+
+    def test_requests_labelled_by_url_name_and_status(self):
+        before = self.samples()
+        self.client.get(reverse("feed"))
+        self.client.get(reverse("ticket_update", args=[999]))
+        after = self.samples()
+
+        self.assertEqual(self.delta(before, after, "litrevu_requests_total",
+                                    view="feed", method="GET", status="200"), 1)
+        self.assertEqual(self.delta(before, after, "litrevu_requests_total",
+                                    view="ticket_update", method="GET", status="404"), 1)
+        self.assertEqual(self.delta(before, after, "litrevu_request_duration_seconds_count",
+                                    view="feed", method="GET"), 1)
+        self.assertEqual(self.delta(before, after, "litrevu_feed_posts_count"), 1)
+
+    @override_settings(FEED_PAGE_SIZE=2)
+    def test_feed_size_is_posts_per_page(self):
+        for i in range(5):
+            Ticket.objects.create(title=f"t{i}", user=self.user)
+        before = self.samples()
+        self.client.get(reverse("feed"))
+        after = self.samples()
+        self.assertEqual(self.delta(before, after, "litrevu_feed_posts_sum"), 2)
+
+    def test_created_objects_and_upload_bytes_counted(self):
+        image = BytesIO()
+        Image.new("RGB", (4, 4)).save(image, "PNG")
+        before = self.samples()
+        self.client.post(reverse("review_create_combo"), {
+            "title": "t", "description": "",
+            "image": SimpleUploadedFile("cover.png", image.getvalue(), "image/png"),
+            "headline": "h", "rating": 4, "body": "",
+        })
+        ticket = Ticket.objects.get()
+        Review.objects.create(ticket=ticket, user=User.objects.create(username="eve"), headline="h", rating=1)
+        after = self.samples()
+
+        self.assertEqual(self.delta(before, after, "litrevu_created_total", kind="ticket"), 1)
+        self.assertEqual(self.delta(before, after, "litrevu_created_total", kind="review"), 2)
+        self.assertEqual(
+            self.delta(before, after, "litrevu_upload_bytes_total", result="stored"), len(image.getvalue())
+        )
+
+    @override_settings(RATE_LIMITS={"signin": {"rate": "1/m", "key": "ip"}})
+    def test_throttled_requests_counted(self):
+        self.client.logout()
+        caches["default"].clear()
+        before = self.samples()
+        for _ in range(2):
+            self.client.post(reverse("login"), {"username": "x", "password": "y"})
+        after = self.samples()
+        self.assertEqual(self.delta(before, after, "litrevu_throttled_total",
+                                    scope="signin", reason="rate"), 1)
+
+
+# Limitation de débit et de concurrence
+@override_settings(CONCURRENCY_LIMITS={})
+class RateLimitTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+
+    def login_attempt(self, address="10.0.0.1", **extra):
+        return self.client.post(
+            reverse("login"), {"username": "x", "password": "y"}, REMOTE_ADDR=address, **extra
+        )
+
+    @override_settings(RATE_LIMITS={"signin": {"rate": "2/m", "key": "ip"}})
+    def test_rate_limit_returns_429_with_retry_after(self):
+        self.assertEqual(self.login_attempt().status_code, 200)
+        self.assertEqual(self.login_attempt().status_code, 200)
+        response = self.login_attempt()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+        # Un autre client garde son propre seau
+        self.assertEqual(self.login_attempt("10.0.0.2").status_code, 200)
+
+    @override_settings(
+        RATE_LIMITS={"signin": {"rate": "1/m", "key": "ip"}}, RATE_LIMIT_TRUSTED_PROXIES=1
+    )
+    def test_client_ip_read_from_trusted_proxy_header(self):
+        proxy = "127.0.0.1"
+        self.assertEqual(self.login_attempt(proxy, HTTP_X_FORWARDED_FOR="1.1.1.1").status_code, 200)
+        self.assertEqual(self.login_attempt(proxy, HTTP_X_FORWARDED_FOR="2.2.2.2").status_code, 200)
+        # Une adresse forgée à gauche de l'en-tête ne permet pas de changer de seau
+        response = self.login_attempt(proxy, HTTP_X_FORWARDED_FOR="9.9.9.9, 1.1.1.1")
+        self.assertEqual(response.status_code, 429)
+
+    @override_settings(CONCURRENCY_LIMITS={"expensive": 1})
+    def test_concurrency_cap_disabled_without_atomic_shared_cache(self):
+        ratelimit._warned_caches.clear()
+        with self.assertLogs("reviews.ratelimit", "WARNING"):
+            self.assertEqual(self.login_attempt().status_code, 200)
+
+
+# Plafond de concurrence : nécessite un cache Redis (simulé par fakeredis)
+@skipUnless(fakeredis, "fakeredis n'est pas installé")
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "shared": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": "redis://localhost:6379/0",
+            "OPTIONS": {"connection_class": getattr(fakeredis, "FakeConnection", None)},
+        },
+    },
+    RATE_LIMIT_CACHE="shared",
+    RATE_LIMITS={},
+    CONCURRENCY_LIMITS={"expensive": 2},
+)
+class ConcurrencyLimitTests(TestCase):
+    def setUp(self):
+        self.cache = caches["shared"]
+        self.cache.clear()
+
+    def login_attempt(self):
+        return self.client.post(reverse("login"), {"username": "x", "password": "y"})
+
+    def occupy(self, slot, timeout=None):
+        self.cache.set(f"concurrency:expensive:{slot}", 1, timeout or ratelimit.CONCURRENCY_TTL)
+
+    def test_cap_returns_503_when_all_slots_are_taken(self):
+        self.occupy(0)
+        self.occupy(1)
+        response = self.login_attempt()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+
+    def test_slot_released_after_request(self):
+        self.occupy(0)
+        self.assertEqual(self.login_attempt().status_code, 200)
+        self.assertEqual(self.login_attempt().status_code, 200)
+        self.assertIsNone(self.cache.get("concurrency:expensive:1"))
+
+    def test_slot_released_when_view_raises(self):
+        @concurrency_limit("expensive")
+        def view(request):
+            raise RuntimeError
+
+        with self.assertRaises(RuntimeError):
+            view(RequestFactory().post("/"))
+        self.assertEqual(self.cache.get_many(["concurrency:expensive:0", "concurrency:expensive:1"]), {})
+
+    def test_leaked_slots_expire_while_requests_keep_arriving(self):
+        # Deux workers tués en pleine requête : leurs créneaux expirent malgré les requêtes refusées
+        self.occupy(0, timeout=1)
+        self.occupy(1, timeout=1)
+        deadline = time.time() + 3
+        statuses = []
+        while time.time() < deadline and 200 not in statuses:
+            statuses.append(self.login_attempt().status_code)
+            time.sleep(0.2)
+        self.assertEqual(statuses[0], 503)
+        self.assertEqual(statuses[-1], 200)
@@ -30,4 +30,7 @@ urlpatterns = [
     # Abonnements
     path("abonnements/", views.subscriptions, name="subscriptions"),  # gestion abonnements
     path("abonnements/<int:user_id>/desabonner/", views.unfollow, name="unfollow"),  # se désabonner d’un utilisateur
+
+    # Supervision
+    path("metrics", views.metrics, name="metrics"),  # métriques Prometheus
 ]
@@ -1,3 +1,4 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
 from itertools import chain
 
 from django.views.decorators.http import require_http_methods
@@ -6,15 +7,31 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth import login as auth_login
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import AuthenticationForm
+from django.conf import settings
+from django.http import HttpResponse
 from django.db.models import CharField, Q, Value, Exists, OuterRef
 from django.db import IntegrityError
-from django.shortcuts import get_object_or_404, redirect, render
+from django.shortcuts import redirect, render
 
 from .forms import SignUpForm, TicketForm, ReviewForm, FollowForm
-from .models import Ticket, Review, UserFollows
+from .models import Ticket, Review, UserFollows, ArchivedTicket, ArchivedReview
+from .metrics import FEED_SIZE, render_metrics
+from .ratelimit import concurrency_limit, rate_limit
+from .archive import (
+    get_ticket_or_404,
+    get_review_or_404,
+    has_reviewed,
+    hot_ticket,
+    save_post,
+    delete_post,
+    get_users_viewable_archived_tickets,
+    get_users_viewable_archived_reviews,
+)
 
 
 # Authentification
+@rate_limit("signup")
+@concurrency_limit("expensive")
 def signup(request):
     # Inscription utilisateur avec connexion automatique après création
     if request.method == "POST":
@@ -31,6 +48,8 @@ def signup(request):
     return render(request, "signup.html", {"form": form})
 
 
+@rate_limit("signin")
+@concurrency_limit("expensive")
 def signin(request):
     # Connexion utilisateur avec AuthenticationForm intégré Django
     if request.method == "POST":
@@ -72,16 +91,78 @@ def get_users_viewable_reviews(user):
 
 
 # Flux principal
+# Pagination par curseur : chaque page contient les posts qui suivent, dans l'ordre du flux,
+# le dernier post affiché. Tables chaudes et archive sont lues avec la même borne,
+# ce qui garantit qu'un post apparaît exactement une fois quel que soit son emplacement.
+CURSOR_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _feed_order(post):
+    # Ordre du flux (décroissant) : date, puis type, puis identifiant pour départager les égalités
+    return (post.time_created, post.content_type, post.pk)
+
+
+def _encode_cursor(post):
+    micros = (post.time_created - CURSOR_EPOCH) // timedelta(microseconds=1)
+    return f"{micros}_{post.content_type}_{post.pk}"
+
+
+def _decode_cursor(value):
+    # Curseur invalide ou hors limites (dates, identifiant 64 bits) : retour à la première page
+    try:
+        micros, content_type, pk = value.split("_")
+        time_created = CURSOR_EPOCH + timedelta(microseconds=int(micros))
+        pk = int(pk)
+    except (ValueError, OverflowError):
+        return None
+    if content_type not in ("TICKET", "REVIEW") or not 0 < pk < 2 ** 63:
+        return None
+    return time_created, content_type, pk
+
+
+def _after_cursor(queryset, content_type, cursor):
+    # Posts de `queryset` (tous du type content_type) situés après le curseur dans l'ordre du flux
+    if cursor is None:
+        return queryset
+    time_created, cursor_type, pk = cursor
+    after = Q(time_created__lt=time_created)
+    if content_type < cursor_type:
+        after |= Q(time_created=time_created)
+    elif content_type == cursor_type:
+        after |= Q(time_created=time_created, pk__lt=pk)
+    return queryset.filter(after)
+
+
 @login_required
 def feed(request):
-    # Combine tickets et critiques visibles puis les trie du plus récent au plus ancien
-    reviews = get_users_viewable_reviews(request.user).annotate(content_type=Value("REVIEW", CharField()))
-    tickets = get_users_viewable_tickets(request.user)
-    posts = sorted(chain(reviews, tickets), key=lambda p: p.time_created, reverse=True)
-    return render(request, "feed.html", {"posts": posts})
+    # Combine tickets et critiques visibles (récents et archivés) puis les trie du plus récent au plus ancien
+    page_size = settings.FEED_PAGE_SIZE
+    cursor = _decode_cursor(request.GET.get("avant", ""))
+    sources = [
+        (get_users_viewable_reviews(request.user).annotate(content_type=Value("REVIEW", CharField())), "REVIEW"),
+        (get_users_viewable_tickets(request.user), "TICKET"),
+        (get_users_viewable_archived_reviews(request.user), "REVIEW"),
+        (get_users_viewable_archived_tickets(request.user), "TICKET"),
+    ]
+    # Chaque source ne fournit que page_size + 1 posts (le surplus indique s'il existe une page suivante)
+    candidates = chain.from_iterable(
+        _after_cursor(queryset, content_type, cursor).order_by("-time_created", "-pk")[: page_size + 1]
+        for queryset, content_type in sources
+    )
+    posts = sorted(candidates, key=_feed_order, reverse=True)
+    FEED_SIZE.observe(len(posts[:page_size]))
+
+    next_cursor = _encode_cursor(posts[page_size - 1]) if len(posts) > page_size else None
+    return render(
+        request,
+        "feed.html",
+        {"posts": posts[:page_size], "next_cursor": next_cursor, "is_first_page": cursor is None},
+    )
 
 # Tickets
 @login_required
+@rate_limit("ticket_create")
+@concurrency_limit("expensive")
 def ticket_create(request):
     # Création d’un ticket par l’utilisateur connecté
     if request.method == "POST":
@@ -100,11 +181,11 @@ def ticket_create(request):
 @login_required
 def ticket_update(request, pk):
     # Modification d’un ticket appartenant à l’utilisateur
-    ticket = get_object_or_404(Ticket, pk=pk, user=request.user)
+    ticket = get_ticket_or_404(pk, user=request.user)
     if request.method == "POST":
         form = TicketForm(request.POST, request.FILES, instance=ticket)
         if form.is_valid():
-            form.save()
+            save_post(form.save(commit=False))  # restaure le ticket s'il était archivé
             messages.success(request, "Ticket modifié.")
             return redirect("my_posts")
     else:
@@ -115,9 +196,9 @@ def ticket_update(request, pk):
 @login_required
 def ticket_delete(request, pk):
     # Suppression d’un ticket appartenant à l’utilisateur
-    ticket = get_object_or_404(Ticket, pk=pk, user=request.user)
+    ticket = get_ticket_or_404(pk, user=request.user)
     if request.method == "POST":
-        ticket.delete()
+        delete_post(ticket)
         messages.success(request, "Ticket supprimé.")
         return redirect("my_posts")
     return render(request, "confirm_delete.html", {"object": ticket, "type": "ticket"})
@@ -127,10 +208,10 @@ def ticket_delete(request, pk):
 @login_required
 def review_create_from_ticket(request, ticket_id):
     # Création d’une critique en réponse à un ticket
-    ticket = get_object_or_404(Ticket, pk=ticket_id)
+    ticket = get_ticket_or_404(ticket_id)
 
     # Vérification : pas de critique en double par le même utilisateur
-    if Review.objects.filter(ticket=ticket, user=request.user).exists():
+    if has_reviewed(ticket.pk, request.user):
         messages.error(request, "Vous avez déjà publié une critique pour ce ticket.")
         return redirect("feed")
 
@@ -140,7 +221,7 @@ def review_create_from_ticket(request, ticket_id):
             try:
                 review = form.save(commit=False)
                 review.user = request.user
-                review.ticket = ticket
+                review.ticket = hot_ticket(ticket)  # restaure le ticket s'il était archivé
                 review.save()
             except IntegrityError:
                 # Sécurité : si la contrainte d’unicité de la base bloque
@@ -156,11 +237,11 @@ def review_create_from_ticket(request, ticket_id):
 @login_required
 def review_update(request, pk):
     # Modification d’une critique appartenant à l’utilisateur
-    review = get_object_or_404(Review, pk=pk, user=request.user)
+    review = get_review_or_404(pk, user=request.user)
     if request.method == "POST":
         form = ReviewForm(request.POST, instance=review)
         if form.is_valid():
-            form.save()
+            save_post(form.save(commit=False))  # restaure le ticket s'il était archivé
             messages.success(request, "Critique modifiée.")
             return redirect("my_posts")
     else:
@@ -171,9 +252,9 @@ def review_update(request, pk):
 @login_required
 def review_delete(request, pk):
     # Suppression d’une critique appartenant à l’utilisateur
-    review = get_object_or_404(Review, pk=pk, user=request.user)
+    review = get_review_or_404(pk, user=request.user)
     if request.method == "POST":
-        review.delete()
+        delete_post(review)
         messages.success(request, "Critique supprimée.")
         return redirect("my_posts")
     return render(request, "confirm_delete.html", {"object": review, "type": "review"})
@@ -192,11 +273,33 @@ def my_posts(request):
         .annotate(has_reviewed=Exists(user_review_exists))
     )
     my_reviews = Review.objects.filter(user=request.user).select_related("ticket").order_by("-time_created")
-    return render(request, "my_posts.html", {"tickets": my_tickets, "reviews": my_reviews})
+
+    # Historique archivé : affiché uniquement à la demande (?historique=1)
+    show_archive = request.GET.get("historique") == "1"
+    archived_tickets = ArchivedTicket.objects.filter(user=request.user)
+    archived_reviews = ArchivedReview.objects.filter(user=request.user)
+    if show_archive:
+        archived_review_exists = ArchivedReview.objects.filter(ticket=OuterRef("pk"), user=request.user)
+        archived_tickets = archived_tickets.order_by("-time_created").annotate(
+            has_reviewed=Exists(archived_review_exists)
+        )
+        archived_reviews = archived_reviews.select_related("ticket").order_by("-time_created")
+        # Un ticket récent peut être plus ancien qu'un ticket archivé (critique récente) : tri commun par date
+        my_tickets = sorted(chain(my_tickets, archived_tickets), key=lambda p: p.time_created, reverse=True)
+        my_reviews = sorted(chain(my_reviews, archived_reviews), key=lambda p: p.time_created, reverse=True)
+        has_archive = False
+    else:
+        has_archive = archived_tickets.exists() or archived_reviews.exists()
+    return render(
+        request,
+        "my_posts.html",
+        {"tickets": my_tickets, "reviews": my_reviews, "has_archive": has_archive},
+    )
 
 
 # Abonnements
 @login_required
+@rate_limit("subscriptions")
 def subscriptions(request):
     # Affiche la liste des abonnements et abonnés
     following = UserFollows.objects.filter(user=request.user).select_related("followed_user")
@@ -244,6 +347,8 @@ def unfollow(request, user_id):
 # Ticket + Review combinés
 @login_required
 @require_http_methods(["GET", "POST"])
+@rate_limit("review_create_combo")
+@concurrency_limit("expensive")
 def review_create_combo(request):
     """
     Création combinée d’un Ticket et d’une Review en une seule étape.
@@ -272,3 +377,11 @@ def review_create_combo(request):
             return redirect("my_posts")
         messages.error(request, "Veuillez corriger les erreurs des formulaires.")
     return render(request, "review_create_combo.html", {"tform": tform, "rform": rform})
+
+
+# Métriques
+@require_http_methods(["GET"])
+def metrics(request):
+    # Exposition des métriques au format texte Prometheus (tous workers confondus)
+    content, content_type = render_metrics()
+    return HttpResponse(content, content_type=content_type)